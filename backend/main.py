@@ -1,14 +1,20 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from typing_extensions import TypedDict
+import asyncio
+import httpx
+import orjson
 import os
-import json
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
-from services.chat_service import ChatService
+from services.chat_service import ChatService, MAX_HISTORY_MESSAGES
+from services.event_log_writer import EventLogWriter
 from services.pdf_ingestion_service import PDFIngestionService
 
 # Load environment variables
@@ -39,13 +45,52 @@ app.add_middleware(
 # Initialize chat service
 chat_service = ChatService()
 pdf_ingestion_service = PDFIngestionService()
+event_log_writer = EventLogWriter()
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared async HTTP client, render pool and event log writer"""
+    # Bounded timeouts: fail fast on connect and on waiting for a pooled
+    # connection under Azure throttling, allow long LLM reads
+    pool_max = int(os.getenv("HTTP_POOL_MAX", "100"))
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(connect=2.0, read=30.0, write=5.0, pool=5.0),
+        limits=httpx.Limits(max_connections=pool_max, max_keepalive_connections=min(20, pool_max)),
+        http2=True
+    )
+    chat_service.http_client = app.state.http
+    # Warm the Azure OpenAI connection in the background so startup is not held up
+    app.state.warm_up_task = asyncio.create_task(chat_service.warm_up())
+
+    # PDF extraction calls share the async client; page rendering gets its worker pool
+    pdf_ingestion_service.http_client = app.state.http
+    pdf_ingestion_service.start_render_pool()
+
+    # Buffered event log writes (EVENT_LOG_BATCH_SIZE / EVENT_LOG_BATCH_MS)
+    await event_log_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending event logs, stop the render pool and close the HTTP client"""
+    await event_log_writer.stop()
+    app.state.warm_up_task.cancel()
+    pdf_ingestion_service.http_client = None
+    await asyncio.to_thread(pdf_ingestion_service.shutdown_render_pool)
+    chat_service.http_client = None
+    await app.state.http.aclose()
 
 # Create data directory for event logs if it doesn't exist
 EVENT_LOG_DIR = Path("data/event_logs")
 EVENT_LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+# Characters in claim numbers that are unsafe in event log filenames
+_CLAIM_SAFE = str.maketrans({" ": "_", "/": "_"})
+
 # Request/Response models
-class ChatMessage(BaseModel):
+class ChatMessage(TypedDict):
+    # Validated as a plain dict, without constructing a model per message
     role: str  # "user" or "assistant"
     content: str
 
@@ -93,6 +138,11 @@ async def health_check():
         "chat_service_configured": chat_service.configured
     }
 
+def _bounded_chat_history(request: ChatRequest) -> deque:
+    """Return the request's chat history as a deque bounded to the context window"""
+    # ChatMessage entries are already plain dicts in OpenAI message format
+    return deque(request.chat_history or (), maxlen=MAX_HISTORY_MESSAGES)
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -100,9 +150,9 @@ async def chat(request: ChatRequest):
     """
     try:
         # Call chat service
-        result = chat_service.chat(
+        result = await chat_service.chat(
             user_message=request.message,
-            chat_history=[{"role": msg.role, "content": msg.content} for msg in request.chat_history],
+            chat_history=_bounded_chat_history(request),
             context_type=request.context_type,
             document_id=request.document_id,
             claims_data=request.claims_data,
@@ -118,6 +168,29 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint; sends the response as server-sent events
+    """
+    async def event_stream():
+        try:
+            async for content in chat_service.stream_chat(
+                user_message=request.message,
+                chat_history=_bounded_chat_history(request),
+                context_type=request.context_type,
+                document_id=request.document_id,
+                claims_data=request.claims_data,
+                event_log=request.event_log
+            ):
+                yield b"data: " + orjson.dumps({"content": content}) + b"\n\n"
+        except Exception as e:
+            yield b"data: " + orjson.dumps({"error": f"Error processing chat request: {str(e)}"}) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/api/pdf-ingestion", response_model=PDFIngestionResponse)
 async def pdf_ingestion_agent(file: UploadFile = File(...)):
     """
@@ -128,7 +201,7 @@ async def pdf_ingestion_agent(file: UploadFile = File(...)):
         if not file_bytes:
             raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
-        result = pdf_ingestion_service.process_pdf(file_bytes, file.filename or "uploaded.pdf")
+        result = await pdf_ingestion_service.aprocess_pdf(file_bytes, file.filename or "uploaded.pdf")
 
         return PDFIngestionResponse(
             success=True,
@@ -151,9 +224,9 @@ async def save_event_log(request: EventLogRequest):
     """
     try:
         # Create filename from claim number (sanitize for filesystem)
-        safe_claim_number = request.claim_number.replace(" ", "_").replace("/", "_")
+        safe_claim_number = request.claim_number.translate(_CLAIM_SAFE)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{safe_claim_number}_{timestamp}.json"
+        filename = f"{safe_claim_number}_{timestamp}.json.gz"
         filepath = EVENT_LOG_DIR / filename
         
         # Prepare log data
@@ -164,18 +237,18 @@ async def save_event_log(request: EventLogRequest):
             "events": request.event_log
         }
         
-        # Save to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, indent=2, ensure_ascii=False)
-        
-        # Also save/update the latest log for this claim
-        latest_filepath = EVENT_LOG_DIR / f"{safe_claim_number}_latest.json"
-        with open(latest_filepath, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, indent=2, ensure_ascii=False)
+        # Serialize here so a payload that cannot be encoded fails the request
+        # instead of being dropped by the background writer
+        payload = orjson.dumps(log_data)
+
+        # Queue the timestamped file and the latest log for this claim;
+        # the background writer flushes them in batches
+        latest_filepath = EVENT_LOG_DIR / f"{safe_claim_number}_latest.json.gz"
+        await event_log_writer.enqueue(filepath, latest_filepath, log_data, payload)
         
         return {
             "success": True,
-            "message": "Event log saved successfully",
+            "message": "Event log queued for saving",
             "filepath": str(filepath),
             "event_count": len(request.event_log)
         }
@@ -188,18 +261,17 @@ async def get_event_log(claim_number: str):
     Get the latest event log for a claim
     """
     try:
-        safe_claim_number = claim_number.replace(" ", "_").replace("/", "_")
-        latest_filepath = EVENT_LOG_DIR / f"{safe_claim_number}_latest.json"
+        safe_claim_number = claim_number.translate(_CLAIM_SAFE)
+        latest_filepath = EVENT_LOG_DIR / f"{safe_claim_number}_latest.json.gz"
         
-        if not latest_filepath.exists():
+        # Served from the writer queue, the read cache, or disk
+        log_data = await event_log_writer.read_latest(latest_filepath)
+        if log_data is None:
             return {
                 "success": False,
                 "message": "Event log not found for this claim"
             }
         
-        with open(latest_filepath, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-        
         return {
             "success": True,
             "data": log_data
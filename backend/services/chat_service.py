@@ -1,7 +1,11 @@
+import io
 import os
-import json
-import requests
-from typing import List, Dict, Any, Optional
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+import httpx
+import orjson
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
@@ -11,33 +15,187 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Chat history kept as context: last 10 request-response pairs = 20 messages
+MAX_HISTORY_MESSAGES = 20
+
+# Cap on activity-log events summarized into the prompt (most recent kept)
+MAX_EVENTS_IN_PROMPT = 200
+
+# Completion parameters shared by buffered and streamed chat calls
+_COMPLETION_PARAMS = {
+    "max_tokens": 1000,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "frequency_penalty": 0,
+    "presence_penalty": 0
+}
+
+# System prompts are fixed text, built once at import time
+_BASE_DASHBOARD_PROMPT = """You are an intelligent assistant for SunLife Insurance Claims Processing Dashboard. 
+You help users understand and analyze insurance claims data, statistics, and processing information.
+
+You can help with:
+1. Explaining claims statistics (processed, accepted, pending, denied)
+2. Analyzing geographical distribution of claims
+3. Understanding claim details and patterns
+4. Answering questions about claims processing
+5. Providing insights about claim trends
+6. Helping with data interpretation and analysis
+
+Instructions:
+1. Be helpful and accurate in your responses
+2. Use the provided claims data when available
+3. Provide specific numbers and statistics when relevant
+4. Keep responses concise but informative
+5. If asked about something not in the data, say so clearly
+6. Format responses with markdown for better readability
+7. Use emojis sparingly to enhance readability (✅ accepted, ⏳ pending, ❌ denied)
+8. When presenting data in tables or lists, ALWAYS use proper markdown table format:
+   - Use markdown tables (| column | column |) for tabular data
+   - Use markdown lists (- or 1.) for sequential data
+   - Use bold (**text**) for emphasis on numbers or key points
+   - Ensure tables are properly formatted with headers and alignment
+
+Please help the user understand and analyze their insurance claims data."""
+
+_DOCUMENT_PROMPT = """You are an intelligent document assistant for SunLife Insurance. 
+You help users understand and analyze insurance claim documents, forms, and related paperwork.
+
+You can help with:
+1. Extracting information from documents
+2. Understanding document content
+3. Answering questions about document details
+4. Identifying key information in forms
+5. Explaining document structure and purpose
+
+Instructions:
+1. Be helpful and accurate in your responses
+2. Use the provided document content when available
+3. Provide specific quotes or references when possible
+4. Keep responses concise but informative
+5. If asked about something not in the document, say so clearly
+6. Format responses with markdown for better readability
+
+Please help the user understand and analyze their insurance documents."""
+
+_GENERAL_PROMPT = """You are an intelligent assistant for SunLife Insurance Claims Processing Portal. 
+You help users with questions about insurance claims, processing, and general inquiries.
+
+Instructions:
+1. Be helpful and accurate in your responses
+2. Keep responses concise but informative
+3. Format responses with markdown for better readability
+4. If you don't know something, say so clearly
+
+Please help the user with their questions."""
+
+# Claims summary line templates; defaults mirror the fallbacks for missing keys
+_STAT_DEFAULTS = {
+    "processedToday": 0, "processedWeek": 0, "processedMonth": 0, "processedQuarter": 0,
+    "accepted": 0, "pending": 0, "denied": 0, "total": 0,
+    "pegaAgent": 0, "pegaAgentWeek": 0, "pegaAgentMonth": 0,
+    "chessAgent": 0, "chessAgentWeek": 0, "chessAgentMonth": 0,
+}
+_STAT_TMPL = (
+    "Statistics:\n"
+    "  - Processed Today: {processedToday}\n"
+    "  - Processed This Week: {processedWeek}\n"
+    "  - Processed This Month: {processedMonth}\n"
+    "  - Processed This Quarter: {processedQuarter}\n"
+    "  - Accepted Claims: {accepted}\n"
+    "  - Pending Claims: {pending}\n"
+    "  - Denied Claims: {denied}"
+)
+_AGENT_STAT_TMPL = (
+    "  - Agent Intake (latest period):\n"
+    "    • Pega Agent Cases: {pegaAgent} (week: {pegaAgentWeek}, month: {pegaAgentMonth})\n"
+    "    • CHESS Agent Cases: {chessAgent} (week: {chessAgentWeek}, month: {chessAgentMonth})"
+)
+_STAT_TOTAL_TMPL = "  - Total Claims: {total}"
+
+_CITY_DEFAULTS = {"city": "Unknown", "total": 0, "accepted": 0, "pending": 0, "denied": 0}
+_CITY_TMPL = "  - {city}: Total={total}, Accepted={accepted}, Pending={pending}, Denied={denied}"
+
+_CLAIM_DEFAULTS = {"claimNumber": "Unknown", "patientName": "Unknown", "status": "Unknown", "city": "Unknown", "amount": 0}
+_CLAIM_TMPL = "  - {claimNumber}: {patientName} ({status}) - {city} - ${amount}"
+
+
+@lru_cache(maxsize=4096)
+def _format_event_time(timestamp: float) -> str:
+    """
+    Format an epoch-millisecond timestamp as HH:MM:SS local time (cached per value)
+    """
+    return datetime.fromtimestamp(timestamp / 1000).strftime("%H:%M:%S")
+
 
 class ChatService:
     """
     Service for chatting with dashboard data and documents using Azure OpenAI
     """
+
+    # Fixed attribute set: no per-instance __dict__, slot access on the hot path
+    __slots__ = (
+        "http_client",
+        "openai_endpoint", "openai_key", "openai_model", "openai_deployment",
+        "configured", "_api_url", "_headers",
+    )
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        # Shared connection pool, bound by the FastAPI startup hook
+        self.http_client = http_client
+
         # Load environment variables
         self.openai_endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
         self.openai_key = os.getenv('AZURE_OPENAI_KEY')
         self.openai_model = os.getenv('AZURE_OPENAI_MODEL', 'gpt-4')
         self.openai_deployment = os.getenv('AZURE_OPENAI_DEPLOYMENT', 'gpt-4')
         self.configured = bool(self.openai_endpoint and self.openai_key)
+
+        # Request URL and headers are fixed per process, so build them once
+        self._api_url = (
+            f"{self.openai_endpoint.rstrip('/')}/openai/deployments/{self.openai_deployment}/chat/completions?api-version=2024-02-15-preview"
+            if self.configured else None
+        )
+        self._headers = {
+            'api-key': self.openai_key,
+            'Content-Type': 'application/json'
+        }
         
         if not self.configured:
             print("Warning: Azure OpenAI credentials not configured. Chat functionality will use fallback responses.")
     
-    def chat(self, user_message: str, chat_history: List[Dict[str, str]] = None, 
-             context_type: str = "dashboard", document_id: Optional[int] = None,
-             claims_data: Optional[Dict[str, Any]] = None,
-             event_log: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    async def warm_up(self) -> None:
+        """
+        Open a pooled connection to Azure OpenAI ahead of the first chat request
+
+        Resolves DNS and completes the TCP+TLS handshake with a lightweight
+        models request under a short timeout; failures and non-2xx replies
+        (e.g. a bad key or endpoint) are logged and otherwise ignored.
+        """
+        if not self.configured or self.http_client is None:
+            return
+        try:
+            response = await self.http_client.get(
+                f"{self.openai_endpoint.rstrip('/')}/openai/models?api-version=2024-02-15-preview",
+                headers=self._headers,
+                timeout=5.0
+            )
+        except httpx.HTTPError as e:
+            logger.warning("Azure OpenAI connection warm-up failed: %s", e)
+            return
+        if not response.is_success:
+            logger.warning("Azure OpenAI connection warm-up returned %s: %s", response.status_code, response.text)
+    
+    async def chat(self, user_message: str, chat_history: Optional[Iterable[Dict[str, str]]] = None, 
+                   context_type: str = "dashboard", document_id: Optional[int] = None,
+                   claims_data: Optional[Dict[str, Any]] = None,
+                   event_log: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Chat with dashboard data or documents
         
         Args:
             user_message: User's message
-            chat_history: Previous chat messages
+            chat_history: Previous chat messages, ideally a deque bounded to MAX_HISTORY_MESSAGES
             context_type: "dashboard" or "document"
             document_id: Document ID if chatting with a document
             claims_data: Claims data for dashboard context
@@ -46,26 +204,8 @@ class ChatService:
             Dictionary with success, response, and error fields
         """
         try:
-            # Prepare the system prompt based on context type
-            if context_type == "dashboard":
-                system_prompt = self._create_dashboard_prompt(claims_data, event_log)
-            elif context_type == "document":
-                system_prompt = self._create_document_prompt(document_id)
-            else:
-                system_prompt = self._create_general_prompt()
-            
-            # Prepare messages for OpenAI
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add chat history (last 10 request-response pairs = 20 messages total)
-            if chat_history:
-                # Limit to last 20 messages (10 conversations = 10 pairs = 20 messages)
-                # This ensures we keep the last 10 request-response pairs as context
-                limited_history = chat_history[-20:] if len(chat_history) > 20 else chat_history
-                messages.extend(limited_history)
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
+            messages = self._build_messages(user_message, chat_history, context_type,
+                                            document_id, claims_data, event_log)
             
             # Call Azure OpenAI - no fallbacks, must be configured
             if not self.configured:
@@ -75,7 +215,7 @@ class ChatService:
                 }
             
             try:
-                response = self._call_azure_openai(messages)
+                response = await self._call_azure_openai(messages)
             except Exception as e:
                 return {
                     "success": False,
@@ -93,43 +233,92 @@ class ChatService:
                 "error": f"Error processing chat request: {str(e)}"
             }
     
-    def _create_dashboard_prompt(self, claims_data: Optional[Dict[str, Any]] = None, 
-                                  event_log: Optional[List[Dict[str, Any]]] = None) -> str:
+    def _build_messages(self, user_message: str, chat_history: Optional[Iterable[Dict[str, str]]],
+                        context_type: str, document_id: Optional[int],
+                        claims_data: Optional[Dict[str, Any]],
+                        event_log: Optional[List[Dict[str, Any]]]) -> List[Dict[str, str]]:
         """
-        Create a system prompt for dashboard chat
+        Build the OpenAI message list: system prompt, bounded history, user message
         """
-        base_prompt = """You are an intelligent assistant for SunLife Insurance Claims Processing Dashboard. 
-You help users understand and analyze insurance claims data, statistics, and processing information.
+        # Prepare the system prompt based on context type
+        if context_type == "dashboard":
+            system_prompt = self._create_dashboard_prompt(claims_data, event_log)
+        elif context_type == "document":
+            system_prompt = self._create_document_prompt(document_id)
+        else:
+            system_prompt = self._create_general_prompt()
+        
+        # Prepare messages for OpenAI
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add chat history (last 10 request-response pairs = 20 messages total).
+        # Callers pass a bounded deque, so it is already trimmed to the window.
+        if chat_history:
+            if not isinstance(chat_history, deque):
+                chat_history = deque(chat_history, maxlen=MAX_HISTORY_MESSAGES)
+            messages.extend(chat_history)
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        
+        return messages
 
-You can help with:
-1. Explaining claims statistics (processed, accepted, pending, denied)
-2. Analyzing geographical distribution of claims
-3. Understanding claim details and patterns
-4. Answering questions about claims processing
-5. Providing insights about claim trends
-6. Helping with data interpretation and analysis
+    async def stream_chat(self, user_message: str, chat_history: Optional[Iterable[Dict[str, str]]] = None,
+                          context_type: str = "dashboard", document_id: Optional[int] = None,
+                          claims_data: Optional[Dict[str, Any]] = None,
+                          event_log: Optional[List[Dict[str, Any]]] = None) -> AsyncIterator[str]:
+        """
+        Stream the assistant response as content deltas
 
-Instructions:
-1. Be helpful and accurate in your responses
-2. Use the provided claims data when available
-3. Provide specific numbers and statistics when relevant
-4. Keep responses concise but informative
-5. If asked about something not in the data, say so clearly
-6. Format responses with markdown for better readability
-7. Use emojis sparingly to enhance readability (✅ accepted, ⏳ pending, ❌ denied)
-8. When presenting data in tables or lists, ALWAYS use proper markdown table format:
-   - Use markdown tables (| column | column |) for tabular data
-   - Use markdown lists (- or 1.) for sequential data
-   - Use bold (**text**) for emphasis on numbers or key points
-   - Ensure tables are properly formatted with headers and alignment
+        Takes the same arguments as chat(). Raises if Azure OpenAI is not
+        configured or the API returns an error.
+        """
+        if not self.configured:
+            raise Exception("Azure OpenAI is not configured. Please set AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_KEY in your .env file.")
+        if self.http_client is None:
+            raise Exception("HTTP client not initialized; the application startup hook must bind one")
 
-Please help the user understand and analyze their insurance claims data."""
+        messages = self._build_messages(user_message, chat_history, context_type,
+                                        document_id, claims_data, event_log)
+        payload = {"messages": messages, "stream": True, **_COMPLETION_PARAMS}
 
-        prompt_parts = [base_prompt]
-        
+        async with self.http_client.stream(
+            "POST",
+            self._api_url,
+            headers=self._headers,
+            content=orjson.dumps(payload)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Azure OpenAI API error: {response.status_code} - {body.decode(errors='replace')}")
+
+            # Server-sent events: one "data: {...}" chunk per delta, then "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = orjson.loads(data)
+                for choice in chunk.get("choices") or ():
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+    
+    def _create_dashboard_prompt(self, claims_data: Optional[Dict[str, Any]] = None, 
+                                  event_log: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Create a system prompt for dashboard chat
+        """
         claims_data = claims_data if isinstance(claims_data, dict) else None
         event_log = event_log if isinstance(event_log, list) else None
 
+        # Nothing to summarize: reuse the base prompt as-is
+        if not claims_data and not event_log:
+            return _BASE_DASHBOARD_PROMPT
+
+        prompt_parts = [_BASE_DASHBOARD_PROMPT]
+
         if claims_data:
             # Add claims data context
             claims_summary = self._format_claims_data_summary(claims_data)
@@ -153,51 +342,30 @@ Please help the user understand and analyze their insurance claims data."""
         if not isinstance(claims_data, dict):
             return "No claims statistics available."
 
-        summary_parts = []
-        
+        summary_parts: List[str] = []
+
         # Statistics
-        if "statistics" in claims_data and isinstance(claims_data.get("statistics"), dict):
-            stats = claims_data["statistics"]
-            summary_parts.append("Statistics:")
-            summary_parts.append(f"  - Processed Today: {stats.get('processedToday', 0)}")
-            summary_parts.append(f"  - Processed This Week: {stats.get('processedWeek', 0)}")
-            summary_parts.append(f"  - Processed This Month: {stats.get('processedMonth', 0)}")
-            summary_parts.append(f"  - Processed This Quarter: {stats.get('processedQuarter', 0)}")
-            summary_parts.append(f"  - Accepted Claims: {stats.get('accepted', 0)}")
-            summary_parts.append(f"  - Pending Claims: {stats.get('pending', 0)}")
-            summary_parts.append(f"  - Denied Claims: {stats.get('denied', 0)}")
-            if any(key in stats for key in ["pegaAgent", "chessAgent"]):
-                summary_parts.append("  - Agent Intake (latest period):")
-                summary_parts.append(f"    • Pega Agent Cases: {stats.get('pegaAgent', 0)} (week: {stats.get('pegaAgentWeek', 0)}, month: {stats.get('pegaAgentMonth', 0)})")
-                summary_parts.append(f"    • CHESS Agent Cases: {stats.get('chessAgent', 0)} (week: {stats.get('chessAgentWeek', 0)}, month: {stats.get('chessAgentMonth', 0)})")
-            summary_parts.append(f"  - Total Claims: {stats.get('total', 0)}")
-        
-        # City data
-        if "cityData" in claims_data and isinstance(claims_data.get("cityData"), list):
-            city_data = claims_data["cityData"]
-            if city_data:
-                summary_parts.append("\nCity-wise Distribution:")
-                for city in city_data[:10]:  # Limit to top 10 cities
-                    city_name = city.get("city", "Unknown")
-                    total = city.get("total", 0)
-                    accepted = city.get("accepted", 0)
-                    pending = city.get("pending", 0)
-                    denied = city.get("denied", 0)
-                    summary_parts.append(f"  - {city_name}: Total={total}, Accepted={accepted}, Pending={pending}, Denied={denied}")
-        
-        # Recent claims
-        if "recentClaims" in claims_data and isinstance(claims_data.get("recentClaims"), list):
-            recent = claims_data["recentClaims"]
-            if recent:
-                summary_parts.append("\nRecent Claims (sample):")
-                for claim in recent[:5]:  # Limit to 5 recent claims
-                    claim_num = claim.get("claimNumber", "Unknown")
-                    patient = claim.get("patientName", "Unknown")
-                    status = claim.get("status", "Unknown")
-                    city = claim.get("city", "Unknown")
-                    amount = claim.get("amount", 0)
-                    summary_parts.append(f"  - {claim_num}: {patient} ({status}) - {city} - ${amount}")
-        
+        stats = claims_data.get("statistics")
+        if isinstance(stats, dict):
+            has_agent_stats = "pegaAgent" in stats or "chessAgent" in stats
+            stats = {**_STAT_DEFAULTS, **stats}
+            summary_parts.append(_STAT_TMPL.format_map(stats))
+            if has_agent_stats:
+                summary_parts.append(_AGENT_STAT_TMPL.format_map(stats))
+            summary_parts.append(_STAT_TOTAL_TMPL.format_map(stats))
+
+        # City data (limit to top 10 cities)
+        city_data = claims_data.get("cityData")
+        if isinstance(city_data, list) and city_data:
+            summary_parts.append("\nCity-wise Distribution:")
+            summary_parts.extend([_CITY_TMPL.format_map({**_CITY_DEFAULTS, **city}) for city in islice(city_data, 10)])
+
+        # Recent claims (limit to 5 recent claims)
+        recent = claims_data.get("recentClaims")
+        if isinstance(recent, list) and recent:
+            summary_parts.append("\nRecent Claims (sample):")
+            summary_parts.extend([_CLAIM_TMPL.format_map({**_CLAIM_DEFAULTS, **claim}) for claim in islice(recent, 5)])
+
         return "\n".join(summary_parts)
     
     def _format_event_log_summary(self, event_log: List[Dict[str, Any]]) -> str:
@@ -207,11 +375,16 @@ Please help the user understand and analyze their insurance claims data."""
         if not isinstance(event_log, list) or not event_log:
             return "No agent activity events recorded yet."
 
-        summary_parts = []
-        summary_parts.append(f"Total Events Recorded: {len(event_log)}")
-        summary_parts.append("\nChronological Activity Timeline (latest last):")
+        buf = io.StringIO()
+        total_events = len(event_log)
+        buf.write(f"Total Events Recorded: {total_events}")
+        if total_events > MAX_EVENTS_IN_PROMPT:
+            buf.write(f"\n(Showing the latest {MAX_EVENTS_IN_PROMPT} events; earlier events omitted)")
+        buf.write("\n\nChronological Activity Timeline (latest last):")
 
-        for raw_event in event_log:
+        # Only the tail of long logs is summarized, so prompt size stays bounded
+        events_view = islice(event_log, max(0, total_events - MAX_EVENTS_IN_PROMPT), total_events)
+        for raw_event in events_view:
             if not isinstance(raw_event, dict):
                 logger.debug("Skipping non-dict event log entry: %s", raw_event)
                 continue
@@ -223,106 +396,65 @@ Please help the user understand and analyze their insurance claims data."""
             reason = event.get("reason", "")
             action = event.get("action")
             
-            time_str = datetime.fromtimestamp(timestamp / 1000).strftime("%H:%M:%S") if timestamp else "N/A"
+            time_str = _format_event_time(timestamp) if timestamp else "N/A"
             
             if from_node:
-                event_desc = f"{from_node} → {to_node}"
+                buf.write(f"\n  [{time_str}] {from_node} → {to_node}")
             else:
-                event_desc = f"Started: {to_node}"
-            
-            summary_parts.append(f"  [{time_str}] {event_desc}")
+                buf.write(f"\n  [{time_str}] Started: {to_node}")
             if reason:
-                summary_parts.append(f"    reason: {reason}")
+                buf.write(f"\n    reason: {reason}")
             if action:
-                summary_parts.append(f"    action: {action}")
+                buf.write(f"\n    action: {action}")
             action_data = event.get("actionData")
             if action_data:
                 try:
-                    formatted_data = json.dumps(action_data, indent=2)
+                    formatted_data = orjson.dumps(
+                        action_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                    ).decode()
                 except (TypeError, ValueError) as exc:
                     logger.debug("Unable to serialize actionData: %s (%s)", action_data, exc)
                     formatted_data = str(action_data)
-                summary_parts.append("    actionData:")
-                for line in formatted_data.splitlines():
-                    summary_parts.append(f"      {line}")
+                # Indent the whole block in one pass rather than line by line
+                buf.write("\n    actionData:\n      ")
+                buf.write(formatted_data.replace("\n", "\n      "))
         
-        return "\n".join(summary_parts)
+        return buf.getvalue()
     
     def _create_document_prompt(self, document_id: Optional[int] = None) -> str:
         """
         Create a system prompt for document chat
         """
-        return """You are an intelligent document assistant for SunLife Insurance. 
-You help users understand and analyze insurance claim documents, forms, and related paperwork.
-
-You can help with:
-1. Extracting information from documents
-2. Understanding document content
-3. Answering questions about document details
-4. Identifying key information in forms
-5. Explaining document structure and purpose
-
-Instructions:
-1. Be helpful and accurate in your responses
-2. Use the provided document content when available
-3. Provide specific quotes or references when possible
-4. Keep responses concise but informative
-5. If asked about something not in the document, say so clearly
-6. Format responses with markdown for better readability
-
-Please help the user understand and analyze their insurance documents."""
+        return _DOCUMENT_PROMPT
     
     def _create_general_prompt(self) -> str:
         """
         Create a general system prompt
         """
-        return """You are an intelligent assistant for SunLife Insurance Claims Processing Portal. 
-You help users with questions about insurance claims, processing, and general inquiries.
-
-Instructions:
-1. Be helpful and accurate in your responses
-2. Keep responses concise but informative
-3. Format responses with markdown for better readability
-4. If you don't know something, say so clearly
-
-Please help the user with their questions."""
+        return _GENERAL_PROMPT
     
-    def _call_azure_openai(self, messages: List[Dict[str, str]]) -> str:
+    async def _call_azure_openai(self, messages: List[Dict[str, str]]) -> str:
         """
         Call Azure OpenAI API with the prepared messages
         """
+        if self.http_client is None:
+            raise Exception("HTTP client not initialized; the application startup hook must bind one")
+
         try:
-            # Prepare the API endpoint
-            api_endpoint = f"{self.openai_endpoint.rstrip('/')}/openai/deployments/{self.openai_deployment}/chat/completions?api-version=2024-02-15-preview"
-            
-            # Headers
-            headers = {
-                'api-key': self.openai_key,
-                'Content-Type': 'application/json'
-            }
-            
             # Request payload
-            payload = {
-                "messages": messages,
-                "max_tokens": 1000,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "frequency_penalty": 0,
-                "presence_penalty": 0
-            }
+            payload = {"messages": messages, **_COMPLETION_PARAMS}
             
-            # Make the request
-            response = requests.post(
-                api_endpoint,
-                headers=headers,
-                json=payload,
-                timeout=30
+            # Make the request over the shared connection pool
+            response = await self.http_client.post(
+                self._api_url,
+                headers=self._headers,
+                content=orjson.dumps(payload)
             )
             
             if response.status_code != 200:
                 raise Exception(f"Azure OpenAI API error: {response.status_code} - {response.text}")
             
-            result = response.json()
+            result = orjson.loads(response.content)
             
             # Extract the response content
             if 'choices' in result and len(result['choices']) > 0:
@@ -0,0 +1,212 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Latest files whose last written digest is remembered (16 bytes each)
+_MAX_TRACKED_LATEST = 1024
+
+# (filepath, latest_filepath, serialized log)
+EventLogItem = Tuple[Path, Path, bytes]
+
+
+class EventLogWriter:
+    """
+    Buffered background writer for simulator event logs.
+
+    The API enqueues logs and returns immediately; a single consumer task
+    drains the queue and flushes once ``batch_size`` logs are pending or
+    ``batch_ms`` milliseconds have passed since the first one arrived.
+    Within a batch every file is written once, so rapid saves for the same
+    claim collapse into a single write of its latest log. Paths ending in
+    ``.gz`` are stored gzip-compressed.
+
+    Reads of a claim's latest log go through ``read_latest``, which serves
+    logs still waiting in the queue and keeps the ``read_cache_size`` most
+    recently read files parsed, keyed by their mtime, inode and size.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        batch_ms: Optional[float] = None,
+        read_cache_size: Optional[int] = None,
+    ) -> None:
+        self.batch_size = max(1, batch_size or int(os.getenv("EVENT_LOG_BATCH_SIZE", "32")))
+        self.batch_ms = max(0.0, batch_ms if batch_ms is not None else float(os.getenv("EVENT_LOG_BATCH_MS", "200")))
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        # Latest logs accepted but not yet on disk, so reads see their own writes
+        # (payload, log_data) per path; the payload identifies the queued entry
+        self._pending_latest: Dict[Path, Tuple[bytes, Dict[str, Any]]] = {}
+        # LRU of the digest last written to each latest file, to skip unchanged rewrites
+        self._last_hash_by_latest: "OrderedDict[Path, bytes]" = OrderedDict()
+        self.read_cache_size = max(
+            0,
+            read_cache_size if read_cache_size is not None else int(os.getenv("EVENT_LOG_READ_CACHE_SIZE", "64")),
+        )
+        # LRU of parsed latest files keyed by path, valid while the file's
+        # (mtime, inode, size) is unchanged; os.replace gives every rewrite a new inode
+        self._read_cache: "OrderedDict[Path, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+
+    async def start(self) -> None:
+        """
+        Start the writer task (called from the FastAPI startup hook)
+        """
+        if self._consumer is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._consumer = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Flush everything still queued and stop the writer task
+        """
+        if self._consumer is None:
+            return
+        await self._queue.put(None)
+        await self._consumer
+        self._consumer = None
+
+    async def enqueue(
+        self, filepath: Path, latest_filepath: Path, log_data: Dict[str, Any], payload: bytes
+    ) -> None:
+        """
+        Queue an event log, already serialized to JSON bytes by the caller, to be
+        written to its timestamped and latest files
+        """
+        if self._consumer is None:
+            raise RuntimeError("Event log writer is not running")
+        self._pending_latest[latest_filepath] = (payload, log_data)
+        await self._queue.put((filepath, latest_filepath, payload))
+
+    async def read_latest(self, latest_filepath: Path) -> Optional[Dict[str, Any]]:
+        """
+        Return the latest log for a claim, or None if none has been saved
+        """
+        pending = self._pending_latest.get(latest_filepath)
+        if pending is not None:
+            return pending[1]
+
+        try:
+            stat = await aiofiles.os.stat(latest_filepath)
+        except FileNotFoundError:
+            # Fall back to an uncompressed log written before compression was enabled
+            if latest_filepath.suffix != ".gz":
+                return None
+            latest_filepath = latest_filepath.with_suffix("")
+            try:
+                stat = await aiofiles.os.stat(latest_filepath)
+            except FileNotFoundError:
+                return None
+        version = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+        cached = self._read_cache.get(latest_filepath)
+        if cached is not None and cached[0] == version:
+            self._read_cache.move_to_end(latest_filepath)
+            return cached[1]
+
+        async with aiofiles.open(latest_filepath, "rb") as f:
+            payload = await f.read()
+        if latest_filepath.suffix == ".gz":
+            payload = await asyncio.to_thread(gzip.decompress, payload)
+        log_data = orjson.loads(payload)
+        if self.read_cache_size > 0:
+            self._read_cache[latest_filepath] = (version, log_data)
+            self._read_cache.move_to_end(latest_filepath)
+            while len(self._read_cache) > self.read_cache_size:
+                self._read_cache.popitem(last=False)
+        return log_data
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            batch: List[EventLogItem] = [item]
+            stopping = False
+            deadline = loop.time() + self.batch_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[EventLogItem]) -> None:
+        # Later entries win, so each file (and each claim's latest file) is written once
+        writes: Dict[Path, bytes] = {}
+        latest_paths = set()
+        for filepath, latest_filepath, payload in batch:
+            writes[filepath] = payload
+            writes[latest_filepath] = payload
+            latest_paths.add(latest_filepath)
+
+        # Compress each log once even though it lands in two files
+        encoded: Dict[Tuple[int, bool], bytes] = {}
+        for path, payload in writes.items():
+            try:
+                compressed = path.suffix == ".gz"
+                data = encoded.get((id(payload), compressed))
+                if data is None:
+                    data = await self._encode(payload, compressed)
+                    encoded[(id(payload), compressed)] = data
+                if path in latest_paths:
+                    await self._write_latest(path, data)
+                else:
+                    async with aiofiles.open(path, "wb") as f:
+                        await f.write(data)
+            except Exception as exc:
+                logger.error("Failed to write event log %s: %s", path, exc)
+            finally:
+                pending = self._pending_latest.get(path)
+                if pending is not None and pending[0] is payload:
+                    del self._pending_latest[path]
+
+    @staticmethod
+    async def _encode(payload: bytes, compressed: bool) -> bytes:
+        if not compressed:
+            return payload
+        # Level 1 keeps compression cheap; mtime=0 makes equal logs compress to equal bytes
+        return await asyncio.to_thread(gzip.compress, payload, compresslevel=1, mtime=0)
+
+    async def _write_latest(self, path: Path, payload: bytes) -> None:
+        """
+        Atomically replace a latest file, skipping the write if its content is unchanged
+        """
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        # Also check the file is still there, in case it was removed outside this process
+        if self._last_hash_by_latest.get(path) == digest and await aiofiles.os.path.exists(path):
+            self._last_hash_by_latest.move_to_end(path)
+            return
+
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(payload)
+        await asyncio.to_thread(os.replace, tmp_path, path)
+        self._last_hash_by_latest[path] = digest
+        self._last_hash_by_latest.move_to_end(path)
+        while len(self._last_hash_by_latest) > _MAX_TRACKED_LATEST:
+            self._last_hash_by_latest.popitem(last=False)
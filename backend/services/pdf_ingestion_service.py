@@ -1,30 +1,218 @@
+import asyncio
 import base64
+import hashlib
 import io
 import json
 import logging
+import multiprocessing
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import httpx
+import orjson
 import requests
 from dotenv import load_dotenv
-from pypdf import PdfReader
-import pypdfium2 as pdfium
-from PIL import Image
-
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
 # Ensure environment variables are available
 load_dotenv()
 
+# Azure-hosted Mistral OCR only accepts a JSON body whose document_url is a URL
+# or data URI, so the PDF is sent inline as base64. Page images are not
+# requested since only the extracted text is used.
+_MISTRAL_OCR_BODY_PREFIX = (
+    b'{"model":"mistral-document-ai-2505","include_image_base64":false,'
+    b'"document":{"type":"document_url","document_url":"data:application/pdf;base64,'
+)
+_MISTRAL_OCR_BODY_SUFFIX = b'"}}'
+
+# System instructions for the extraction model
+_INSTRUCTIONS_TEXT = (
+    "You are a Sun Life insurance PDF ingestion agent. "
+    "Your task is to extract structured data from dental and medical claim PDFs. "
+    "Return a single JSON object that mirrors the fields present in the PDF. "
+    "Use the following guidelines:\n"
+    "1. Key top-level sections typically include ClaimantInformation, ClaimDetails, ProviderInformation, "
+    "Invoice, PrescriptionRequest, and AdditionalNotes.\n"
+    "2. Within each section, include all data points that appear in the document. "
+    "Use nested objects to reflect structure (e.g., addresses, items, expenses).\n"
+    "3. Preserve numeric values as numbers when possible, otherwise keep strings.\n"
+    "4. Use null for fields that are explicitly absent but expected.\n"
+    "5. NEVER invent data that is not in the document. If unsure, omit the field or set it to null.\n"
+    "6. Preserve bilingual (French/English) text when present.\n"
+    "7. Output valid JSON only. Do not include commentary, markdown, or code fences.\n"
+)
+
+# Retry policy for Azure OpenAI and Mistral calls, shared by the requests session
+# and the async client: connect errors and these statuses only, with exponential
+# backoff unless the server sends Retry-After
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRIES = 3
+_RETRY_BACKOFF = 0.3
+_MAX_RETRY_AFTER = 60.0
+
+# Part of every result cache key; bump when the user prompt or result format changes
+_CACHE_VERSION = "1"
+
+# Longest edge, in pixels, of page images sent to the vision model
+_MAX_IMAGE_DIMENSION = 2048
+
+
+def _render_page(page: Any, scale: float, image_format: str, quality: int) -> Tuple[str, int, int]:
+    """
+    Render an open pdfium page to a base64-encoded image and return (image, width, height).
+    """
+    from PIL import Image
+
+    bitmap = page.render(scale=scale)
+    pil_image: Image.Image = bitmap.to_pil()
+
+    # Cap resolution: pixels beyond this only inflate the vision payload
+    if max(pil_image.size) > _MAX_IMAGE_DIMENSION:
+        pil_image.thumbnail((_MAX_IMAGE_DIMENSION, _MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        pil_image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        pil_image.save(
+            buffer,
+            format="JPEG",
+            quality=quality,
+            optimize=False,
+            progressive=False,
+            subsampling=2,
+        )
+    # getbuffer() avoids copying the image bytes; base64 output is pure ASCII
+    encoded = base64.b64encode(buffer.getbuffer()).decode("ascii")
+    width, height = pil_image.width, pil_image.height
+
+    pil_image.close()
+    bitmap.close()
+    return encoded, width, height
+
+
+def _render_page_to_b64(
+    pdf_bytes: bytes, index: int, scale: float, image_format: str, quality: int
+) -> Tuple[str, int, int]:
+    """
+    Render a single PDF page from raw bytes; see _render_page.
+
+    Module-level so it can run in a worker process. pdfium documents cannot
+    cross process boundaries, so each call opens its own, and the image encode
+    happens here so only the compact base64 string is sent back to the parent.
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(io.BytesIO(pdf_bytes))
+    try:
+        page = pdf[index]
+        try:
+            return _render_page(page, scale, image_format, quality)
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+
+def _safe_extract(pdf: Any, index: int) -> str:
+    """
+    Return the text of one page of an open pdfium document, or "" if extraction fails.
+    """
+    page = pdf[index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_bounded() or ""
+        finally:
+            textpage.close()
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.warning("Failed to extract text from page %s: %s", index + 1, exc)
+        return ""
+    finally:
+        page.close()
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} block in text, ignoring braces inside strings.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : pos + 1]
+    return None
+
+
+def _retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    """
+    Seconds to wait before retrying: the server's Retry-After when given in
+    seconds (capped), otherwise exponential backoff as urllib3 applies it.
+    """
+    if retry_after:
+        try:
+            return min(max(0.0, float(retry_after)), _MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return _RETRY_BACKOFF * (2 ** attempt)
+
+
+def _sse_delta(line: str) -> Optional[str]:
+    """
+    Return the first choice's content delta from one server-sent event line,
+    "" for lines without content, or None once the stream reports [DONE].
+    """
+    if not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return None
+    chunk = orjson.loads(data)
+    for choice in chunk.get("choices") or ():
+        if choice.get("index", 0) == 0:
+            return (choice.get("delta") or {}).get("content") or ""
+    return ""
+
 
 class PDFIngestionService:
     """
     Extract data from PDF claim documents using Azure OpenAI.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None) -> None:
+        # Shared async client for aprocess_pdf, bound by the app startup hook
+        self.http_client = http_client
+
         self.openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.openai_key = os.getenv("AZURE_OPENAI_KEY")
         self.openai_deployment = os.getenv("AZURE_OPENAI_PDF_DEPLOYMENT") or os.getenv(
@@ -49,6 +237,29 @@ class PDFIngestionService:
             self.openai_endpoint and self.openai_key and self.openai_deployment
         )
 
+        # Pooled keep-alive session shared by the Azure OpenAI and Mistral calls,
+        # so the TLS handshake is paid once rather than per document.
+        # POST is retried explicitly since urllib3 only retries idempotent verbs by default,
+        # but only on connect errors and throttling/5xx statuses: a read error means the
+        # server may already be running the (billable) completion, so it is not resent.
+        self._http = requests.Session()
+        self._http.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=_MAX_RETRIES,
+                    read=False,
+                    other=False,
+                    backoff_factor=_RETRY_BACKOFF,
+                    status_forcelist=_RETRY_STATUSES,
+                    allowed_methods=frozenset({"POST"}),
+                    raise_on_status=False,
+                ),
+            ),
+        )
+
         # Load reference JSON examples to guide extraction
         reference_files = [
             Path("data/initial_agent_sample_data_from_client/extracted_data/2025_11_03_01.json"),
@@ -56,43 +267,156 @@ class PDFIngestionService:
             Path("data/pend_data/Scenario 1/extracted_data/Sample2.json"),
         ]
         self.reference_examples = self._load_reference_examples(reference_files)
+        # Instructions and examples never change at runtime, so the system message
+        # content is built once and shared by every prompt
+        self._system_content_base: List[Dict[str, str]] = [
+            {"type": "text", "text": _INSTRUCTIONS_TEXT}
+        ]
+        examples_snippet = self._build_examples_snippet(self.reference_examples)
+        if examples_snippet:
+            self._system_content_base.append({"type": "text", "text": examples_snippet})
+        # Fingerprint of the system prompt, so cached results expire when it changes
+        self._prompt_digest = hashlib.blake2b(
+            orjson.dumps(self._system_content_base), digest_size=8
+        ).hexdigest()
+
+        # Page rendering pool, created on first multi-page PDF
+        self.render_workers = max(
+            1, int(os.getenv("PDF_INGESTION_RENDER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+        )
+        self._render_pool: Optional[ProcessPoolExecutor] = None
+        self._render_pool_lock = threading.Lock()
+        # Upper bound, in seconds, on waiting for the pool to render one document
+        self.render_timeout = float(os.getenv("PDF_INGESTION_RENDER_TIMEOUT", "30"))
+
+        # Page image encoding; WebP is ~30% smaller than JPEG at similar quality
+        self.image_format = (
+            "webp"
+            if os.getenv("PDF_INGESTION_IMAGE_FORMAT", "jpeg").strip().lower() == "webp"
+            else "jpeg"
+        )
+        self.image_quality = (
+            75
+            if self.image_format == "webp"
+            else int(os.getenv("PDF_INGESTION_JPEG_QUALITY", "80"))
+        )
+
+        # Results cached by PDF content and extraction settings, in memory and
+        # optionally on disk, so repeated documents skip the Azure round trip
+        self.cache_size = int(os.getenv("PDF_INGESTION_CACHE_SIZE", "128"))
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        cache_dir = os.getenv("PDF_INGESTION_CACHE_DIR")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
 
     def process_pdf(self, pdf_bytes: bytes, file_name: str) -> Dict[str, Any]:
         """
         Extract structured JSON data from a PDF document using Azure OpenAI.
         """
+        self._ensure_configured()
+
+        cache_key = self._cache_key(pdf_bytes, file_name)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return {**cached, "file_name": file_name}
+
+        metadata, messages = self._prepare_request(pdf_bytes, file_name)
+        raw_response = self._call_azure_openai(messages)
+        result = self._build_result(file_name, metadata, raw_response)
+        if self._is_cacheable(result):
+            self._cache_put(cache_key, result)
+        return result
+
+    async def aprocess_pdf(self, pdf_bytes: bytes, file_name: str) -> Dict[str, Any]:
+        """
+        Async variant of process_pdf.
+
+        OCR, text extraction and rendering run in a worker thread, and the
+        Azure OpenAI call goes over the shared HTTP/2 client when one is bound,
+        so concurrent uploads share its connection pool.
+        """
+        self._ensure_configured()
+
+        cache_key = self._cache_key(pdf_bytes, file_name)
+        cached = await self._acache_get(cache_key)
+        if cached is not None:
+            return {**cached, "file_name": file_name}
+
+        metadata, messages = await asyncio.to_thread(self._prepare_request, pdf_bytes, file_name)
+        if self.http_client is not None:
+            raw_response = await self._acall_azure_openai(messages)
+        else:
+            raw_response = await asyncio.to_thread(self._call_azure_openai, messages)
+        result = self._build_result(file_name, metadata, raw_response)
+        if self._is_cacheable(result):
+            await self._acache_put(cache_key, result)
+        return result
+
+    def _ensure_configured(self) -> None:
         if not self.configured:
             raise ValueError(
                 "Azure OpenAI credentials not configured. "
                 "Please set AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_KEY, and AZURE_OPENAI_DEPLOYMENT in your environment."
             )
 
-        text, metadata = self._extract_pdf_text(pdf_bytes)
-        metadata["text_source"] = "pypdf"
+    def _prepare_request(
+        self, pdf_bytes: bytes, file_name: str
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Run OCR, text extraction and page rendering, and return (metadata, messages).
+        """
+        # pdfium and Pillow load native libraries, so they are imported on first use
+        # rather than at app startup
+        import pypdfium2 as pdfium
 
-        if (
+        use_mistral = bool(
             self.include_text
             and self.use_mistral_ocr
             and self.mistral_endpoint
             and self.mistral_key
-        ):
-            mistral_text = self._call_mistral_document_ai(pdf_bytes)
+        )
+
+        # Parse the PDF once and use it for page count, text and rendering. It is
+        # opened before OCR so a corrupt upload fails without a Mistral round trip.
+        try:
+            pdf = pdfium.PdfDocument(io.BytesIO(pdf_bytes))
+        except pdfium.PdfiumError as exc:
+            raise ValueError(f"Unable to read PDF: {exc}") from exc
+        try:
+            # Run Mistral OCR first; local text extraction is only needed as a fallback
+            mistral_text = self._call_mistral_document_ai(pdf_bytes) if use_mistral else None
+
             if mistral_text:
                 text = mistral_text
-                metadata["text_source"] = "mistral_document_ai"
+                metadata: Dict[str, Any] = {
+                    "page_count": len(pdf),
+                    "truncated": False,
+                    "character_count": len(text),
+                    "max_chars": int(os.getenv("PDF_INGESTION_MAX_CHARS", "20000")),
+                    "text_source": "mistral_document_ai",
+                }
             else:
-                metadata["ocr_warning"] = "Mistral OCR failed; falling back to PyPDF text."
-        page_images, image_info = self._render_pdf_images(pdf_bytes)
-        metadata.update(image_info)
+                text, metadata = self._extract_pdf_text(pdf)
+                metadata["text_source"] = "pdfium"
+                if use_mistral:
+                    metadata["ocr_warning"] = "Mistral OCR failed; falling back to PDFium text."
+            page_images, image_info = self._render_pdf_images(pdf, pdf_bytes)
+            metadata.update(image_info)
+        finally:
+            pdf.close()
+
         if self.include_text and not text.strip():
             raise ValueError("Unable to extract readable text from PDF.")
 
         prompt_text = text if self.include_text else ""
 
         messages = self._build_prompt(prompt_text, file_name, metadata, page_images)
+        return metadata, messages
 
-        raw_response = self._call_azure_openai(messages)
-
+    def _build_result(
+        self, file_name: str, metadata: Dict[str, Any], raw_response: str
+    ) -> Dict[str, Any]:
         parsed_json, parse_error = self._safe_parse_json(raw_response)
 
         result: Dict[str, Any] = {
@@ -107,27 +431,119 @@ class PDFIngestionService:
 
         return result
 
-    def _extract_pdf_text(self, pdf_bytes: bytes) -> Tuple[str, Dict[str, Any]]:
+    @staticmethod
+    def _is_cacheable(result: Dict[str, Any]) -> bool:
         """
-        Extract raw text from the PDF using pypdf.
+        Only cache complete extractions; a retry may succeed where this one degraded.
         """
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        text_chunks: List[str] = []
-        for idx, page in enumerate(reader.pages):
-            try:
-                page_text = page.extract_text() or ""
-            except Exception as exc:  # pragma: no cover - defensive
-                logger.warning("Failed to extract text from page %s: %s", idx + 1, exc)
-                page_text = ""
-            text_chunks.append(page_text.strip())
+        if "parse_error" in result:
+            return False
+        metadata = result["metadata"]
+        # Mistral OCR failed and the pdfium fallback would be stored under the OCR key
+        if "ocr_warning" in metadata:
+            return False
+        # Some pages failed to render
+        expected_pages = min(metadata.get("page_count", 0), metadata.get("max_pages", 0))
+        return metadata.get("rendered_page_count", 0) >= expected_pages
+
+    def _cache_key(self, pdf_bytes: bytes, file_name: str) -> str:
+        """
+        Hash the PDF content together with the file name (which is part of the
+        prompt) and every setting that changes the extraction.
+        """
+        digest = hashlib.blake2b(pdf_bytes, digest_size=16)
+        digest.update(
+            f"|{_CACHE_VERSION}|{self._prompt_digest}|{file_name}"
+            f"|{int(self.include_text)}{int(self.use_mistral_ocr)}"
+            f"|{os.getenv('PDF_INGESTION_MAX_CHARS', '20000')}"
+            f"|{os.getenv('PDF_INGESTION_MAX_PAGES', '3')}"
+            f"|{os.getenv('PDF_INGESTION_RENDER_SCALE', '2.0')}"
+            f"|{self.image_format}|{self.image_quality}"
+            f"|{self.openai_deployment}|{self.api_version}".encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._cache_lookup(key)
+        if result is None and self.cache_dir:
+            result = self._cache_remember(key, self._cache_load(key))
+        return result
 
-        # Keep only non-empty blocks and enforce a sensible upper limit to avoid overly long prompts.
-        text = "\n\n".join(chunk for chunk in text_chunks if chunk)
+    async def _acache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Async variant of _cache_get; disk reads run in a worker thread.
+        """
+        result = self._cache_lookup(key)
+        if result is None and self.cache_dir:
+            result = self._cache_remember(key, await asyncio.to_thread(self._cache_load, key))
+        return result
+
+    def _cache_put(self, key: str, result: Dict[str, Any]) -> None:
+        self._cache_remember(key, result)
+        if self.cache_dir:
+            self._cache_store(key, result)
+
+    async def _acache_put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Async variant of _cache_put; disk writes run in a worker thread.
+        """
+        self._cache_remember(key, result)
+        if self.cache_dir:
+            await asyncio.to_thread(self._cache_store, key, result)
+
+    def _cache_lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _cache_remember(self, key: str, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result is not None and self.cache_size > 0:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _cache_load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a result from the disk cache (blocking).
+        """
+        path = self.cache_dir / f"{key}.json"
+        try:
+            if path.exists():
+                return orjson.loads(path.read_bytes())
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.debug("Unable to read cached result %s: %s", path, exc)
+        return None
+
+    def _cache_store(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Write a result to the disk cache (blocking).
+        """
+        path = self.cache_dir / f"{key}.json"
+        try:
+            path.write_bytes(orjson.dumps(result))
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.debug("Unable to write cached result %s: %s", path, exc)
+
+    def _extract_pdf_text(self, pdf: Any) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extract raw text from an open pdfium document.
+        """
+        page_count = len(pdf)
+        text_chunks: List[str] = [
+            page_text for page_text in (_safe_extract(pdf, idx) for idx in range(page_count)) if page_text
+        ]
+
+        # Normalize and trim once over the joined text, then enforce a sensible
+        # upper limit to avoid overly long prompts.
+        text = "\n\n".join(text_chunks).replace("\r\n", "\n").strip()
         max_chars = int(os.getenv("PDF_INGESTION_MAX_CHARS", "20000"))
         truncated_text = text[:max_chars]
 
         metadata: Dict[str, Any] = {
-            "page_count": len(reader.pages),
+            "page_count": page_count,
             "truncated": len(truncated_text) < len(text),
             "character_count": len(truncated_text),
             "max_chars": max_chars,
@@ -135,9 +551,12 @@ class PDFIngestionService:
 
         return truncated_text, metadata
 
-    def _render_pdf_images(self, pdf_bytes: bytes) -> Tuple[List[str], Dict[str, Any]]:
+    def _render_pdf_images(self, pdf: Any, pdf_bytes: bytes) -> Tuple[List[str], Dict[str, Any]]:
         """
-        Render PDF pages into base64-encoded JPEG images for multimodal extraction.
+        Render PDF pages into base64-encoded JPEG (or WebP) images for multimodal extraction.
+
+        Single pages render from the already-open document; multi-page renders
+        go to the worker pool, which reopens the document from pdf_bytes.
         """
         images: List[str] = []
         image_info: Dict[str, Any] = {
@@ -146,65 +565,134 @@ class PDFIngestionService:
             "image_resolution": None,
         }
         try:
-            pdf = pdfium.PdfDocument(io.BytesIO(pdf_bytes))
             total_pages = len(pdf)
             max_pages = int(os.getenv("PDF_INGESTION_MAX_PAGES", "3"))
             image_info["max_pages"] = max_pages
 
             scale = float(os.getenv("PDF_INGESTION_RENDER_SCALE", "2.0"))
-
-            for index in range(min(total_pages, max_pages)):
+            render_count = min(total_pages, max_pages)
+
+            # One slot per page, in page order; None means not rendered yet
+            rendered: List[Optional[Tuple[str, int, int]]] = [None] * render_count
+            # Pages that timed out in the pool are skipped rather than retried
+            # inline, where they would block this thread instead
+            skipped = set()
+            # Not worth the process hop for a single page
+            if render_count > 1 and self.render_workers > 1:
+                pool = self._get_render_pool()
+                try:
+                    futures = [
+                        pool.submit(
+                            _render_page_to_b64, pdf_bytes, index, scale, self.image_format, self.image_quality
+                        )
+                        for index in range(render_count)
+                    ]
+                    deadline = time.monotonic() + self.render_timeout
+                    for index, future in enumerate(futures):
+                        try:
+                            rendered[index] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                        except FutureTimeoutError:
+                            logger.warning("Rendering page %s timed out; skipping it", index + 1)
+                            future.cancel()
+                            skipped.add(index)
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as exc:
+                            logger.warning("Rendering page %s in the pool failed, retrying inline: %s", index + 1, exc)
+                    if skipped:
+                        # Hung workers would keep their slots; start a fresh pool next time
+                        self._reset_render_pool(pool)
+                except BrokenProcessPool as exc:
+                    # A worker died (e.g. OOM-killed); replace the pool on the next PDF
+                    # and render the remaining pages inline
+                    logger.warning("Render pool failed, rendering pages inline: %s", exc)
+                    self._reset_render_pool(pool)
+
+            for index in range(render_count):
+                if rendered[index] is not None or index in skipped:
+                    continue
                 page = pdf[index]
-                bitmap = page.render(scale=scale)
-                pil_image: Image.Image = bitmap.to_pil()
+                try:
+                    rendered[index] = _render_page(page, scale, self.image_format, self.image_quality)
+                except Exception as exc:  # pragma: no cover - defensive
+                    logger.warning("Failed to render page %s: %s", index + 1, exc)
+                finally:
+                    page.close()
 
-                buffer = io.BytesIO()
-                pil_image.save(buffer, format="JPEG", quality=85)
-                encoded = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            for encoded, width, height in filter(None, rendered):
                 images.append(encoded)
-
                 if image_info["image_resolution"] is None:
                     image_info["image_resolution"] = {
-                        "width": pil_image.width,
-                        "height": pil_image.height,
+                        "width": width,
+                        "height": height,
                         "scale": scale,
                     }
 
-                page.close()
-                pil_image.close()
-                bitmap.close()
-
-            pdf.close()
             image_info["rendered_page_count"] = len(images)
         except Exception as exc:  # pragma: no cover - defensive
             logger.warning("Failed to render PDF pages for vision prompt: %s", exc)
 
         return images, image_info
 
+    def start_render_pool(self) -> None:
+        """
+        Create the page rendering pool up front (called from the FastAPI startup hook)
+        """
+        if self.render_workers > 1:
+            self._get_render_pool()
+
+    def shutdown_render_pool(self) -> None:
+        """
+        Stop the page rendering workers (called from the FastAPI shutdown hook)
+        """
+        with self._render_pool_lock:
+            pool, self._render_pool = self._render_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_render_pool(self) -> ProcessPoolExecutor:
+        with self._render_pool_lock:
+            if self._render_pool is None:
+                # Workers come from a clean server process rather than forking the
+                # multi-threaded app process
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in methods else "spawn"
+                )
+                self._render_pool = ProcessPoolExecutor(
+                    max_workers=self.render_workers, mp_context=context
+                )
+            return self._render_pool
+
+    def _reset_render_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._render_pool_lock:
+            if self._render_pool is pool:
+                self._render_pool = None
+        # shutdown() does not stop a worker stuck on a page, so terminate them
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
     def _call_mistral_document_ai(self, pdf_bytes: bytes) -> Optional[str]:
         """
         Use Azure-hosted Mistral Document AI to perform OCR on the PDF.
         """
         try:
-            pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
-            payload = {
-                "model": "mistral-document-ai-2505",
-                "document": {
-                    "type": "document_url",
-                    "document_url": f"data:application/pdf;base64,{pdf_base64}",
-                },
-                "include_image_base64": True,
-            }
+            # The body is assembled from bytes so the base64 document is never
+            # decoded to str or re-escaped by the JSON encoder
+            body = b"".join(
+                (_MISTRAL_OCR_BODY_PREFIX, base64.b64encode(pdf_bytes), _MISTRAL_OCR_BODY_SUFFIX)
+            )
 
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.mistral_key}",
             }
 
-            response = requests.post(
+            response = self._http.post(
                 self.mistral_endpoint,
                 headers=headers,
-                json=payload,
+                data=body,
                 timeout=120,
             )
 
@@ -214,7 +702,7 @@ class PDFIngestionService:
                 )
                 return None
 
-            result = response.json()
+            result = orjson.loads(response.content)
             text_fragments: List[str] = []
 
             if isinstance(result, dict):
@@ -254,13 +742,28 @@ class PDFIngestionService:
         for path in paths:
             try:
                 if path.exists():
-                    with path.open("r", encoding="utf-8") as handle:
-                        content = json.load(handle)
-                        examples.append(content)
+                    examples.append(orjson.loads(path.read_bytes()))
             except Exception as exc:  # pragma: no cover - defensive
                 logger.debug("Unable to load reference example %s: %s", path, exc)
         return examples[:2]  # limit to keep prompt compact
 
+    def _build_examples_snippet(self, examples: List[Dict[str, Any]]) -> str:
+        """
+        Serialize reference examples into the system prompt snippet.
+        """
+        example_jsons = []
+        for example in examples:
+            try:
+                example_jsons.append(orjson.dumps(example, option=orjson.OPT_INDENT_2).decode())
+            except TypeError:
+                continue
+        if not example_jsons:
+            return ""
+        return (
+            "Here are examples of the desired JSON structure derived from similar documents:\n"
+            + "\n\n".join(example_jsons)
+        )
+
     def _build_prompt(
         self,
         document_text: str,
@@ -271,36 +774,6 @@ class PDFIngestionService:
         """
         Construct chat messages for Azure OpenAI with guidance and examples.
         """
-        instructions = (
-            "You are a Sun Life insurance PDF ingestion agent. "
-            "Your task is to extract structured data from dental and medical claim PDFs. "
-            "Return a single JSON object that mirrors the fields present in the PDF. "
-            "Use the following guidelines:\n"
-            "1. Key top-level sections typically include ClaimantInformation, ClaimDetails, ProviderInformation, "
-            "Invoice, PrescriptionRequest, and AdditionalNotes.\n"
-            "2. Within each section, include all data points that appear in the document. "
-            "Use nested objects to reflect structure (e.g., addresses, items, expenses).\n"
-            "3. Preserve numeric values as numbers when possible, otherwise keep strings.\n"
-            "4. Use null for fields that are explicitly absent but expected.\n"
-            "5. NEVER invent data that is not in the document. If unsure, omit the field or set it to null.\n"
-            "6. Preserve bilingual (French/English) text when present.\n"
-            "7. Output valid JSON only. Do not include commentary, markdown, or code fences.\n"
-        )
-
-        examples_snippet = ""
-        if self.reference_examples:
-            example_jsons = []
-            for example in self.reference_examples:
-                try:
-                    example_jsons.append(json.dumps(example, indent=2, ensure_ascii=False))
-                except TypeError:
-                    continue
-            if example_jsons:
-                examples_snippet = (
-                    "Here are examples of the desired JSON structure derived from similar documents:\n"
-                    + "\n\n".join(example_jsons)
-                )
-
         if self.include_text:
             user_prompt = (
                 f"Document name: {file_name}\n"
@@ -318,10 +791,6 @@ class PDFIngestionService:
                 "Return the structured JSON exactly as specified in the instructions."
             )
 
-        system_content: List[Dict[str, str]] = [{"type": "text", "text": instructions}]
-        if examples_snippet:
-            system_content.append({"type": "text", "text": examples_snippet})
-
         user_content: List[Dict[str, Any]] = [{"type": "text", "text": user_prompt}]
 
         for idx, image_b64 in enumerate(page_images):
@@ -329,7 +798,7 @@ class PDFIngestionService:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_b64}",
+                        "url": f"data:image/{self.image_format};base64,{image_b64}",
                         "detail": "high",
                     },
                     "page_index": idx,
@@ -337,15 +806,80 @@ class PDFIngestionService:
             )
 
         messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": system_content},
+            {"role": "system", "content": self._system_content_base},
             {"role": "user", "content": user_content},
         ]
         return messages
 
-    def _call_azure_openai(self, messages: List[Dict[str, str]]) -> str:
+    def _call_azure_openai(self, messages: List[Dict[str, Any]]) -> str:
         """
         Send the prompt to Azure OpenAI and return the raw response text.
         """
+        api_endpoint, headers, body = self._azure_request(messages)
+        with self._http.post(
+            api_endpoint, headers=headers, data=body, timeout=60, stream=True
+        ) as response:
+            if response.status_code != 200:
+                self._raise_api_error(response.status_code, response.text)
+
+            content = io.StringIO()
+            for line in response.iter_lines():
+                delta = _sse_delta(line.decode("utf-8"))
+                if delta is None:
+                    break
+                content.write(delta)
+        return self._completion_text(content)
+
+    async def _acall_azure_openai(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Send the prompt to Azure OpenAI over the shared async client.
+        """
+        if self.http_client is None:
+            raise RuntimeError("HTTP client not initialized; the application startup hook must bind one")
+
+        api_endpoint, headers, body = self._azure_request(messages)
+        # Same retry policy as the requests session: connect errors and
+        # throttling/5xx statuses are retried, read errors are not
+        attempt = 0
+        while True:
+            try:
+                async with self.http_client.stream(
+                    "POST",
+                    api_endpoint,
+                    headers=headers,
+                    content=body,
+                    timeout=httpx.Timeout(60.0, connect=2.0),
+                ) as response:
+                    if response.status_code in _RETRY_STATUSES and attempt < _MAX_RETRIES:
+                        delay = _retry_delay(response.headers.get("Retry-After"), attempt)
+                        reason = f"status {response.status_code}"
+                    elif response.status_code != 200:
+                        await response.aread()
+                        self._raise_api_error(response.status_code, response.text)
+                    else:
+                        content = io.StringIO()
+                        async for line in response.aiter_lines():
+                            delta = _sse_delta(line)
+                            if delta is None:
+                                break
+                            content.write(delta)
+                        return self._completion_text(content)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                if attempt >= _MAX_RETRIES:
+                    raise
+                delay = _retry_delay(None, attempt)
+                reason = str(exc) or type(exc).__name__
+
+            attempt += 1
+            logger.warning(
+                "Azure OpenAI request failed (%s); retry %s/%s in %.1fs", reason, attempt, _MAX_RETRIES, delay
+            )
+            await asyncio.sleep(delay)
+
+    def _azure_request(self, messages: List[Dict[str, Any]]) -> Tuple[str, Dict[str, str], bytes]:
+        """
+        Build the endpoint, headers and serialized body for a streamed chat completion.
+        """
         api_endpoint = (
             f"{self.openai_endpoint.rstrip('/')}/openai/deployments/"
             f"{self.openai_deployment}/chat/completions?api-version={self.api_version}"
@@ -356,42 +890,55 @@ class PDFIngestionService:
             "Content-Type": "application/json",
         }
 
+        # Streamed so the completion is accumulated as it arrives instead of
+        # buffering and re-parsing the whole response body
         payload = {
             "messages": messages,
             "max_tokens": 2000,
             "temperature": 0.2,
             "top_p": 0.9,
+            "stream": True,
         }
 
-        response = requests.post(api_endpoint, headers=headers, json=payload, timeout=60)
+        return api_endpoint, headers, orjson.dumps(payload)
 
-        if response.status_code != 200:
-            logger.error("Azure OpenAI API error: %s - %s", response.status_code, response.text)
-            raise RuntimeError(
-                f"Azure OpenAI API error: {response.status_code} - {response.text}"
-            )
-
-        result = response.json()
-        choices = result.get("choices", [])
-        if not choices:
-            raise RuntimeError("Azure OpenAI response did not include choices.")
+    @staticmethod
+    def _raise_api_error(status_code: int, text: str) -> None:
+        logger.error("Azure OpenAI API error: %s - %s", status_code, text)
+        raise RuntimeError(f"Azure OpenAI API error: {status_code} - {text}")
 
-        return choices[0]["message"]["content"]
+    @staticmethod
+    def _completion_text(content: io.StringIO) -> str:
+        text = content.getvalue()
+        if not text:
+            raise RuntimeError("Azure OpenAI response did not include any content.")
+        return text
 
     def _safe_parse_json(self, raw_response: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
         Attempt to parse the LLM response as JSON and return (parsed_json, error_message).
         """
+        cleaned = raw_response.strip()
+        # Remove surrounding code fences if present
+        if cleaned.startswith("```"):
+            cleaned = cleaned.strip("`")
+            if cleaned.startswith("json"):
+                cleaned = cleaned[4:]
         try:
-            cleaned = raw_response.strip()
-            # Remove surrounding code fences if present
-            if cleaned.startswith("```"):
-                cleaned = cleaned.strip("`")
-                if cleaned.startswith("json"):
-                    cleaned = cleaned[4:]
-            return json.loads(cleaned), None
-        except Exception as exc:
-            logger.debug("Failed to parse JSON response: %s", exc)
-            return None, str(exc)
+            return orjson.loads(cleaned), None
+        except orjson.JSONDecodeError as exc:
+            error = exc
+
+        # Fall back to the first balanced {...} block, for responses that wrap the
+        # JSON in prose, and parse it leniently to allow raw control characters in strings
+        candidate = _extract_json_object(cleaned)
+        if candidate is not None:
+            try:
+                return json.loads(candidate, strict=False), None
+            except ValueError:
+                pass
+
+        logger.debug("Failed to parse JSON response: %s", error)
+        return None, str(error)
 
 